@@ -14,70 +14,130 @@
 # GNU General Public License for more details.
 
 import argparse
+import functools
+import hashlib
+import itertools
 import json
 import logging
 import multiprocessing
+import operator
 import os
-import shlex
+import shutil
 import sqlite3
 import subprocess
 import sys
 import tempfile
+import urllib.parse
 import yaml
+try:
+    import orjson
+except ImportError:
+    orjson = None
+try:
+    import ijson
+except ImportError:
+    ijson = None
 
 
-logger = None
+# The root logger is configured by setup_logging(), in the worker processes by init_worker().
+logger = logging.getLogger()
+# GeoJSON FeatureCollections (serialized) of the requested regions by their ID, set in the worker processes by init_worker()
+region_features = None
+# Directory for temporary files, set in the worker processes by init_worker()
+temp_dir = None
+# Number of threads of pigz, set in the worker processes by init_worker()
+compress_threads = None
 DEFAULT_MAP_ZOOM = 7
+# Number of tile IDs passed to SQLite per executemany() call
+TILE_CHUNK_SIZE = 10000
+# Temporary files are small and short-living. Keep them in memory if possible.
+TEMP_PARENT_DIR = "/dev/shm" if os.access("/dev/shm", os.W_OK | os.X_OK) else None
+# Compress tarballs with pigz if it is installed. Each worker process runs its own compressor, i.e. up to
+# --processes × --compress-threads threads compress in parallel.
+PIGZ = shutil.which("pigz")
+# Otherwise, use igzip of the Intel ISA-L which is a lot faster than gzip but single-threaded.
+IGZIP = shutil.which("igzip")
+
+
+def cmd_to_str(args):
+    if type(args) is list:
+        return " ".join(args)
+    return args
 
 
-def run_cmd(args, i, shell=False, cwd=None, env=None, check_output=False):
-    args_for_print = ""
-    if type(args) is list:
-        args_for_print = " ".join(args)
-    else:
-        args_for_print = args
-    logger.debug("{}: {}".format(i, args_for_print))
-    if check_output:
-        #TODO handle return code != 0
-        return subprocess.check_output(args, shell=shell, cwd=cwd, env=env)
-    r = subprocess.run(args, shell=shell, cwd=cwd, env=env)
-    if r.returncode != 0:
-        logger.error("{}: Command returned with code {}. Command was:\n{}".format(i, r.returncode, args_for_print))
-        r.check_returncode()
-
-
-def merge_bounding_boxes(bbox1, bbox2):
-    return [
-        min(bbox1[0], bbox2[0]),
-        min(bbox1[1], bbox2[1]),
-        max(bbox1[2], bbox2[2]),
-        max(bbox1[3], bbox2[3]),
-    ]
-
-
-def add_to_bbox(bbox, x, y):
-    return [
-        min(bbox[0], x),
-        min(bbox[1], y),
-        max(bbox[2], x),
-        max(bbox[3], y),
-    ]
-
-
-def bbox_of_ring(ring):
-    bbox = [181.0, 91.0, -181.0, -91.0]
-    for elem in ring:
-        if type(elem) is list and type(elem[0]) is float:
-            bbox = add_to_bbox(bbox, elem[0], elem[1])
-        elif type(elem) is list:
-            bbox = merge_bounding_boxes(bbox, bbox_of_ring(elem))
-    return bbox
+def start_cmd(args, i, cwd=None, env=None, stdin=None, stdout=subprocess.PIPE):
+    """Start a command and return its Popen object.
+
+    By default, its output can be read from the stdout attribute while it runs. Pass the stdout attribute of another
+    command as stdin to build a pipeline.
+    """
+    logger.debug("{}: {}".format(i, cmd_to_str(args)))
+    return subprocess.Popen(args, cwd=cwd, env=env, stdin=stdin, stdout=stdout, bufsize=1048576)
+
+
+def wait_cmd(proc, i):
+    """Wait for a command started by start_cmd() and raise CalledProcessError if it failed.
+    """
+    if proc.stdout:
+        proc.stdout.close()
+    returncode = proc.wait()
+    if returncode != 0:
+        logger.error("{}: Command returned with code {}. Command was:\n{}".format(i, returncode, cmd_to_str(proc.args)))
+        raise subprocess.CalledProcessError(returncode, proc.args)
+
+
+def wait_pipeline(procs, i):
+    """Wait for all commands of a pipeline and raise CalledProcessError if any of them failed.
+
+    The failures of all stages are logged, not only the first one.
+    """
+    errors = []
+    for proc in procs:
+        try:
+            wait_cmd(proc, i)
+        except subprocess.CalledProcessError as e:
+            errors.append(e)
+    if errors:
+        raise errors[0]
+
+
+def iter_position_lists(coordinates):
+    """Yield all non-empty lists of positions of a (possibly nested) GeoJSON coordinates array in no particular order.
+    """
+    # Use an explicit stack instead of recursion.
+    stack = [coordinates]
+    while stack:
+        elem = stack.pop()
+        if not elem:
+            continue
+        if not isinstance(elem[0], list):
+            # single position (Point)
+            yield [elem]
+        elif not elem[0] or isinstance(elem[0][0], list):
+            stack.extend(elem)
+        else:
+            # list of positions (LineString, ring of a Polygon)
+            yield elem
 
 
 def get_bbox(geometry):
     """Get bounding box from geometry.
     """
-    return bbox_of_ring(geometry["coordinates"])
+    bbox = [181.0, 91.0, -181.0, -91.0]
+    get_x = operator.itemgetter(0)
+    get_y = operator.itemgetter(1)
+    # min() and max() over whole rings run in C, only the loop over the rings runs in Python.
+    for positions in iter_position_lists(geometry["coordinates"]):
+        xs = list(map(get_x, positions))
+        ys = list(map(get_y, positions))
+        bbox = [min(bbox[0], min(xs)), min(bbox[1], min(ys)), max(bbox[2], max(xs)), max(bbox[3], max(ys))]
+    return bbox
+
+
+def get_bbox_area(bbox):
+    """Get area of bbox in square degrees.
+    """
+    return (bbox[2] - bbox[0]) * (bbox[3] - bbox[1])
 
 
 def get_center(bbox):
@@ -86,35 +146,52 @@ def get_center(bbox):
     return [0.5 * (bbox[2] - bbox[0]) + bbox[0], 0.5 * (bbox[3] - bbox[1]) + bbox[1], DEFAULT_MAP_ZOOM]
 
 
-def write_metadata_json(input_dir, geometry):
-    """Write updated metadata.json file. This function alters the bounding box and adds data source and attribution.
+def json_dumps(obj):
+    """Serialize obj to JSON and return it as bytes. Use orjson if it is installed because it is a lot faster.
+    """
+    if orjson:
+        return orjson.dumps(obj)
+    return json.dumps(obj).encode("utf-8")
+
+
+def json_loads(data):
+    """Deserialize JSON from bytes or str. Use orjson if it is installed because it is a lot faster.
+    """
+    if orjson:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def write_metadata_json(source_metadata, bbox, path):
+    """Write updated metadata.json file to path and return the path. This function alters the bounding box and adds data source and attribution.
+
+    source_metadata is the content of the metadata.json file of the input. It is not modified.
     """
-    metadata = {}
-    with open(os.path.join(input_dir, "metadata.json"), "r") as infile:
-        metadata = json.load(infile)
+    metadata = dict(source_metadata)
     metadata["name"] = "Shortbread"
     metadata["attribution"] = "OpenStreetMap contributors (ODbL)"
-    bbox = get_bbox(geometry)
     metadata["bounds"] = bbox
     metadata["center"] = get_center(bbox)
-    path = None
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".json") as tmpfile:
-        json.dump(metadata, tmpfile)
-        path = tmpfile.name
+    with open(path, "wb") as outfile:
+        outfile.write(json_dumps(metadata))
     return path
 
 
-def write_geojson_feature(feature):
-    """Write GeoJSON feature to a named temporary file and return its path.
+def feature_collection_json(feature):
+    """Return a GeoJSON FeatureCollection containing only the feature, serialized as bytes.
     """
     geojson_feature_collection = {
         "type": "FeatureCollection",
         "features": [feature],
     }
-    path = None
-    with tempfile.NamedTemporaryFile(mode="w", delete=False, suffix=".json") as tmpfile:
-        json.dump(geojson_feature_collection, tmpfile)
-        path = tmpfile.name
+    return json_dumps(geojson_feature_collection)
+
+
+def write_geojson_feature(geojson_data, path):
+    """Write a serialized GeoJSON FeatureCollection to a file and return its path.
+    """
+    with open(path, "wb") as outfile:
+        outfile.write(geojson_data)
     return path
 
 
@@ -124,6 +201,16 @@ def remove_leading_slash(path):
     return path
 
 
+def transform_regex(path):
+    """Return a regular expression for tar's --transform option matching exactly the path.
+
+    The expression is delimited by commas. Only characters which are special in a basic regular expression and the
+    delimiter are escaped. GNU extensions like \\| would turn other escaped characters into operators.
+    """
+    escaped = "".join("\\" + c if c in "\\.*[^$," else c for c in path)
+    return "^{}$".format(escaped)
+
+
 def delete_if_exists(path):
     if not path:
         return
@@ -133,67 +220,145 @@ def delete_if_exists(path):
         pass
 
 
-def convert_tile_list(tile_list):
-    """Convert a list of tile IDs in z/x/y format into a list of tuples of ints with the following strcuture: (zoom_level, tile_column, tile_row)
+def convert_tile_list(lines):
+    """Convert lines with tile IDs in z/x/y format into tuples of ints with the following strcuture: (zoom_level, tile_column, tile_row)
 
-    The returned list uses the tiling schema of MBTiles (Y axis pointing to the north).
+    This is a generator and can be fed directly from the output of the tile list program.
+    The returned tuples use the tiling schema of MBTiles (Y axis pointing to the north).
     """
-    result = []
-    #TODO handle encoding
-    for t in tile_list.decode("utf-8").split("\n"):
-        if t == "":
+    # int() accepts ASCII digits as bytes, no need to decode the output of the tile list program.
+    for line in lines:
+        line = line.strip()
+        if not line:
             continue
-        parts = [int(p) for p in t.split("/")]
-        zoom = parts[0]
-        y_corrected = (2 ** zoom - 1) - parts[2]
-        result.append((zoom, parts[1], y_corrected,))
-    return result
+        zoom, x, y = line.split(b"/")
+        zoom = int(zoom)
+        yield (zoom, int(x), (1 << zoom) - 1 - int(y))
+
 
+def read_only_uri(path):
+    """Return an SQLite URI to open a database read-only and without any locking.
 
-def create_mbtiles(input_path, output_path, tile_list, bbox, sqlite_charset):
-    """Create an MBTiles by copying tiles and metadata from an existing database.
+    The database must not be modified while this program is running.
+    """
+    return "file:{}?mode=ro&immutable=1".format(urllib.parse.quote(os.path.abspath(path)))
+
+
+def insert_tiles(cur, output_path, source_metadata):
+    """Create a new database at output_path, attach it as schema "region" and copy the wanted tiles into it.
+    """
+    cur.execute("ATTACH DATABASE ? AS region;", (output_path,))
+    # The page size can only be changed before the first table is created.
+    cur.execute("PRAGMA region.page_size = 32768;")
+    cur.execute("PRAGMA region.auto_vacuum = 0;")
+    cur.execute("PRAGMA region.cache_size = -1048576;") # 2 GiB cache
+    cur.execute("PRAGMA region.mmap_size = 1073741824;") # 1 GiB
+    cur.execute("PRAGMA region.locking_mode = EXCLUSIVE;")
+    # No journal because the output file is written from scratch and a failed run has to be repeated anyway. No WAL
+    # because it is stored persistently in the file and readers would need write access to the directory.
+    cur.execute("PRAGMA region.journal_mode = OFF;")
+    cur.execute("PRAGMA region.synchronous = OFF;")
+    cur.execute("CREATE TABLE region.tiles (zoom_level integer, tile_column integer, tile_row integer, tile_data blob);")
+    # Copy all tiles with a single statement inside a single transaction.
+    # The tiles table has no primary key or unique constraint on purpose. Indexes are built after the
+    # transaction has been committed because a single sort at the end is much cheaper than maintaining
+    # the B-tree during the bulk insert.
+    zoom_levels = cur.execute("SELECT z, count(*) FROM wanted GROUP BY z ORDER BY z;").fetchall()
+    cur.execute("BEGIN;")
+    # Tiles are copied zoom level by zoom level, each one is a contiguous range of the index of the source.
+    # CROSS JOIN forces SQLite to loop over the wanted tiles and look them up in the source, not vice versa.
+    # Looking them up in (zoom_level, tile_column, tile_row) order reads the index of the source sequentially
+    # instead of jumping around in it, and the index of the output is built from presorted rows. The ORDER BY
+    # costs nothing because it matches the primary key of the temporary table.
+    for zoom, count in zoom_levels:
+        logger.debug("Copying {} tiles of zoom level {}".format(count, zoom))
+        cur.execute("INSERT INTO region.tiles (zoom_level, tile_column, tile_row, tile_data) SELECT s.zoom_level, s.tile_column, s.tile_row, s.tile_data FROM wanted AS w CROSS JOIN source.tiles AS s ON s.zoom_level = w.z AND s.tile_column = w.x AND s.tile_row = w.y WHERE w.z = ? ORDER BY w.x, w.y;", (zoom,))
+    cur.execute("COMMIT;")
+    cur.execute("CREATE UNIQUE INDEX region.tile_index on tiles (zoom_level, tile_column, tile_row);")
+    cur.execute("ANALYZE region;")
+    cur.execute("CREATE TABLE region.metadata (name text, value text);")
+    cur.executemany("INSERT INTO region.metadata (name, value) VALUES (?, ?)", source_metadata)
+
+
+def copy_and_delete_tiles(cur, input_path, copy_path):
+    """Copy the source database file to copy_path, attach it as schema "region" and delete all tiles which are not wanted.
+    """
+    # Depending on the file system, no data is copied at all (reflinks).
+    shutil.copyfile(input_path, copy_path)
+    cur.execute("ATTACH DATABASE ? AS region;", (copy_path,))
+    cur.execute("PRAGMA region.cache_size = -1048576;") # 2 GiB cache
+    cur.execute("PRAGMA region.locking_mode = EXCLUSIVE;")
+    cur.execute("PRAGMA region.journal_mode = OFF;")
+    cur.execute("PRAGMA region.synchronous = OFF;")
+    cur.execute("BEGIN;")
+    cur.execute("DELETE FROM region.tiles WHERE NOT EXISTS (SELECT 1 FROM wanted AS w WHERE w.z = tiles.zoom_level AND w.x = tiles.tile_column AND w.y = tiles.tile_row);")
+    cur.execute("DELETE FROM region.metadata WHERE name IN ('bounds', 'center');")
+    cur.execute("COMMIT;")
+
+
+def create_mbtiles(input_path, output_path, tile_list, bbox, sqlite_charset, source_metadata, copy_min_tiles):
+    """Create an MBTiles by copying tiles from an existing database.
+
+    source_metadata is a list of (name, value) tuples of the metadata of the existing database (except bounds and center).
+    If the region has more than copy_min_tiles tiles, the database file is copied and the tiles outside of the region
+    are deleted. Otherwise (or if copy_min_tiles is None) the tiles are copied into a new database.
+
+    Return False if an error occurred.
     """
     if os.path.isfile(output_path):
-        logger.warning("Deleting and rewriting {}".format(output_path))
+        logger.warning("Deleting leftover temporary file {}".format(output_path))
         os.remove(output_path)
+    copy_path = output_path + ".tmp"
     bbox_str = ",".join([str(b) for b in bbox])
     center_str = ",".join([str(c) for c in get_center(bbox)])
-    exit_prog = False
+    success = True
     conn = None
     cur = None
     try:
-        conn = sqlite3.connect(output_path)
+        # The output database is attached later because the way it is created depends on the number of tiles.
+        # The main database is only needed for its encoding which is used by all attached databases.
+        conn = sqlite3.connect(":memory:", uri=True, isolation_level=None)
         cur = conn.cursor()
-        #TODO escape filename
         cur.execute("PRAGMA encoding = '{}';".format(sqlite_charset))
-        cur.execute("PRAGMA auto_vacuum = 0;")
-        cur.execute("PRAGMA cache_size = -1048576;") # 2 GiB cache
-        cur.execute("PRAGMA journal_mode = OFF;")
-        cur.execute("PRAGMA synchronous = OFF;")
-        conn.commit()
-        cur.execute("ATTACH DATABASE '{}' AS source;".format(input_path))
-        cur.execute("CREATE TABLE tiles (zoom_level integer, tile_column integer, tile_row integer, tile_data blob);")
-        for tile in tile_list:
-            cur.execute("INSERT INTO tiles (zoom_level, tile_column, tile_row, tile_data) SELECT zoom_level, tile_column, tile_row, tile_data FROM source.tiles WHERE zoom_level = %s AND tile_column = %s AND tile_row = %s" % tile)
-        conn.commit()
-        cur.execute("CREATE UNIQUE INDEX tile_index on tiles (zoom_level, tile_column, tile_row);")
-        conn.commit()
-        cur.execute("CREATE TABLE metadata AS SELECT name, value FROM source.metadata WHERE name NOT IN ('bounds', 'center');")
-        cur.execute("INSERT INTO metadata (name, value) VALUES ('bounds', ?)", (bbox_str,))
-        cur.execute("INSERT INTO metadata (name, value) VALUES ('center', ?)", (center_str,))
-        conn.commit()
+        cur.execute("PRAGMA temp_store = MEMORY;")
+        cur.execute("ATTACH DATABASE ? AS source;", (read_only_uri(input_path),))
+        # The default page cache of the source (2 MB) is too small for the index lookups of large regions.
+        cur.execute("PRAGMA source.cache_size = -524288;") # 512 MiB cache
+        cur.execute("PRAGMA source.mmap_size = 8589934592;") # 8 GiB
+        # The tile list is consumed as it arrives, the primary key of the temporary table keeps it sorted.
+        cur.execute("CREATE TEMP TABLE wanted (z integer, x integer, y integer, PRIMARY KEY (z, x, y)) WITHOUT ROWID;")
+        cur.execute("BEGIN;")
+        tile_iter = iter(tile_list)
+        chunk = list(itertools.islice(tile_iter, TILE_CHUNK_SIZE))
+        while chunk:
+            cur.executemany("INSERT OR IGNORE INTO wanted (z, x, y) VALUES (?, ?, ?)", chunk)
+            chunk = list(itertools.islice(tile_iter, TILE_CHUNK_SIZE))
+        cur.execute("COMMIT;")
+        tile_count = cur.execute("SELECT count(*) FROM wanted;").fetchone()[0]
+        copy_whole_file = copy_min_tiles is not None and tile_count > copy_min_tiles
+        if copy_whole_file:
+            logger.debug("Copying {} and deleting tiles outside of the region".format(input_path))
+            copy_and_delete_tiles(cur, input_path, copy_path)
+        else:
+            insert_tiles(cur, output_path, source_metadata)
+        cur.execute("DROP TABLE wanted;")
+        cur.execute("INSERT INTO region.metadata (name, value) VALUES ('bounds', ?)", (bbox_str,))
+        cur.execute("INSERT INTO region.metadata (name, value) VALUES ('center', ?)", (center_str,))
+        if copy_whole_file:
+            # VACUUM INTO writes a compact copy without the space of the deleted tiles.
+            cur.execute("VACUUM region INTO ?;", (output_path,))
+        cur.execute("DETACH DATABASE region;")
         cur.execute("DETACH DATABASE source;")
-        conn.commit()
     except Exception as e:
         logger.exception(e)
-        exit_prog = True
+        success = False
     finally:
         if cur:
             cur.close()
         if conn:
             conn.close()
-    if exit_prog:
-        sys.exit(1)
+        delete_if_exists(copy_path)
+    return success
 
 
 def get_output_path(output_base_dir, file_name_template, suffix, region_path):
@@ -201,175 +366,488 @@ def get_output_path(output_base_dir, file_name_template, suffix, region_path):
     return os.path.join(output_base_dir, path)
 
 
-def create_tileset_mbtiles(i, polygon_to_tile_list, input_path, output_base_dir, region_path, geojson_feature, minzoom, maxzoom, suffix, path_template, sqlite_charset):
-    # Write GeoJSON feature to temporary file
+class ConfigError(Exception):
+    """The configuration file is invalid.
+    """
+    pass
+
+
+def validate_config(config):
+    """Check the structure of the configuration once after loading it. Raise ConfigError if it is invalid.
+    """
+    if not isinstance(config, dict):
+        raise ConfigError("configuration is not a mapping")
+    if not isinstance(config.get("path_template"), str):
+        raise ConfigError("'path_template' not found or not a string")
+    try:
+        # The template is formatted with the region path as its only argument.
+        config["path_template"].format("x")
+    except (IndexError, KeyError, ValueError) as e:
+        raise ConfigError("'path_template' is not a valid template for a single region path: {}".format(e))
+    polygons = config.get("polygons")
+    if not isinstance(polygons, list) or len(polygons) == 0:
+        raise ConfigError("'polygons' not found or an empty list")
+    for n, polygon in enumerate(polygons, 1):
+        if not isinstance(polygon, dict):
+            raise ConfigError("entry {} of 'polygons' is not a mapping".format(n))
+        if not isinstance(polygon.get("id"), (str, int)) or isinstance(polygon.get("id"), bool):
+            raise ConfigError("entry {} of 'polygons' has no valid 'id'".format(n))
+        if not isinstance(polygon.get("region_path"), str) or polygon["region_path"] == "":
+            raise ConfigError("entry {} of 'polygons' has no valid 'region_path'".format(n))
+
+
+class GeoJSONError(Exception):
+    """A GeoJSON feature cannot be used as clipping polygon.
+    """
+    pass
+
+
+def validate_feature(feature):
+    """Check the geometry of a GeoJSON feature once when it is indexed. Raise GeoJSONError if it cannot be used.
+    """
+    geometry = feature.get("geometry")
+    if not isinstance(geometry, dict):
+        raise GeoJSONError("feature has no geometry")
+    # GeometryCollections have no coordinates.
+    if not isinstance(geometry.get("coordinates"), list):
+        raise GeoJSONError("geometry of type {} has no coordinates".format(geometry.get("type")))
+    if next(iter_position_lists(geometry["coordinates"]), None) is None:
+        raise GeoJSONError("geometry is empty")
+
+
+def check_region(polygon, region_index, invalid_regions, strict):
+    """Check if the GeoJSON feature of a requested region exists and is valid. Exit if not and strict is set.
+    """
+    if polygon["id"] in region_index:
+        return True
+    if polygon["id"] in invalid_regions:
+        msg = "Region {} has an invalid GeoJSON feature: {}".format(polygon["id"], invalid_regions[polygon["id"]])
+    else:
+        msg = "Region {} not found among GeoJSON features.".format(polygon["id"])
+    if strict:
+        logger.error(msg)
+        sys.exit(1)
+    logger.warning(msg)
+    return False
+
+
+def get_signature(*params):
+    """Return a hash of all parameters which affect the content of an output file.
+    """
+    # Always use the json module with fixed settings. The output of orjson differs, and installing or removing it
+    # must not invalidate all signatures.
+    canonical = json.dumps(params, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_up_to_date(output_path, input_mtime, signature):
+    """Check if an output file is newer than the input and has been created with the same parameters.
+    """
+    try:
+        if os.path.getmtime(output_path) < input_mtime:
+            return False
+        with open(output_path + ".sig", "r") as infile:
+            return infile.read().strip() == signature
+    except OSError:
+        return False
+
+
+def write_signature(output_path, signature):
+    """Write the signature of an output file to its sidecar file. Remove an outdated sidecar file if signature is None.
+    """
+    if signature is None:
+        delete_if_exists(output_path + ".sig")
+        return
+    with open(output_path + ".sig", "w") as outfile:
+        outfile.write(signature + "\n")
+
+
+def setup_logging(log_level):
+    """Configure the root logger. This has no effect if it has already been configured.
+    """
+    logging.basicConfig(level=log_level, format="%(asctime)s %(levelname)s: %(message)s")
+
+
+def init_worker(log_level, features, directory, threads):
+    """Initialize a worker process of the pool with the data shared by all its tasks.
+
+    Worker processes started by fork inherit the logging configuration of the parent. Others have to set it up again.
+    """
+    global region_features, temp_dir, compress_threads
+    setup_logging(log_level)
+    region_features = features
+    temp_dir = directory
+    compress_threads = threads
+
+
+def create_tileset_mbtiles(i, polygon_to_tile_list, input_path, output_base_dir, region_path, polygon_id, bbox, minzoom, maxzoom, suffix, path_template, sqlite_charset, source_metadata, copy_min_tiles, signature):
+    """Create an MBTiles tile set of a region. Return False if it failed.
+    """
     error = False
     geojson_path = None
+    proc = None
+    part_filename = None
     try:
-        geojson_path = write_geojson_feature(geojson_feature)
-        bbox = get_bbox(geojson_feature["geometry"])
+        geojson_data = region_features[polygon_id]
         output_filename = get_output_path(output_base_dir, path_template, "mbtiles", region_path)
+        if os.path.isfile(output_filename):
+            logger.warning("Rewriting {}".format(output_filename))
+        # The tile set is written to a temporary file which replaces the output file when it is complete.
+        part_filename = output_filename + ".part"
+        # Write GeoJSON feature to temporary file
+        geojson_path = write_geojson_feature(geojson_data, os.path.join(temp_dir, "{}.geojson".format(i)))
         os.makedirs(os.path.dirname(output_filename), exist_ok=True)
         logger.info("{}: Creating tile set {}".format(i, region_path))
+        # The tile list program is called once per region for all zoom levels. Deriving the lower zoom levels from
+        # the highest one here would not save work because the program does not compute them that way, and it could
+        # differ from the tiles it selects for the lower zoom levels.
         args = [polygon_to_tile_list, "-g", geojson_path, "-z", str(minzoom), "-Z", str(maxzoom)]
         cwd = os.path.dirname(input_path)
         if cwd == "":
             cwd = "."
-        tile_list = run_cmd(args, i, False, cwd, {"OGR_ENABLE_PARTIAL_REPROJECTION": "TRUE"}, True)
-        tile_list = convert_tile_list(tile_list)
+        # The tile list is streamed into the database while the tile list program is still running.
+        proc = start_cmd(args, i, cwd, {"OGR_ENABLE_PARTIAL_REPROJECTION": "TRUE"})
         logger.debug("Writing tiles and metadata to {}".format(output_filename))
-        create_mbtiles(input_path, output_filename, tile_list, bbox, sqlite_charset)
+        if create_mbtiles(input_path, part_filename, convert_tile_list(proc.stdout), bbox, sqlite_charset, source_metadata, copy_min_tiles):
+            wait_cmd(proc, i)
+            # Remove the old signature first. It must not remain next to a new file if writing the new one fails.
+            delete_if_exists(output_filename + ".sig")
+            os.replace(part_filename, output_filename)
+            write_signature(output_filename, signature)
+        else:
+            error = True
     except subprocess.CalledProcessError:
         error = True
+    except Exception as e:
+        logger.exception(e)
+        error = True
     finally:
+        if proc and proc.poll() is None:
+            proc.kill()
+            proc.wait()
         delete_if_exists(geojson_path)
     if error:
-        exit(1)
+        # Don't leave an incomplete tile set behind.
+        delete_if_exists(part_filename)
+        logger.error("{}: Failed to create tile set {}".format(i, region_path))
+        return False
     logger.info("{}: Completed tile set {}".format(i, region_path))
     return True
 
 
-def create_tileset_targz(i, polygon_to_tile_list, input_dir, output_base_dir, region_path, geojson_feature, minzoom, maxzoom, suffix, path_template, sqlite_charset):
-    # Write GeoJSON feature to temporary file
+def create_tileset_targz(i, polygon_to_tile_list, input_dir, output_base_dir, region_path, polygon_id, bbox, minzoom, maxzoom, suffix, path_template, sqlite_charset, source_metadata, copy_min_tiles, signature):
+    """Create a tarball tile set of a region. Return False if it failed.
+    """
     error = False
     geojson_path = None
+    metadata_path = None
+    procs = []
+    part_filename = None
     try:
-        geojson_path = write_geojson_feature(geojson_feature)
-        metadata_path = write_metadata_json(input_dir, geojson_feature["geometry"])
+        geojson_data = region_features[polygon_id]
         output_filename = get_output_path(output_base_dir, path_template, "tar.gz", region_path)
+        # The tarball is written to a temporary file which replaces the output file when it is complete.
+        # Deduplicating identical tarballs (e.g. by hardlinks) would be pointless: every tarball contains a
+        # metadata.json file with the bounds and center of its region, so no two regions produce the same file.
+        part_filename = output_filename + ".part"
+        # Write GeoJSON feature to temporary file
+        geojson_path = write_geojson_feature(geojson_data, os.path.join(temp_dir, "{}.geojson".format(i)))
+        metadata_path = write_metadata_json(source_metadata, bbox, os.path.join(temp_dir, "{}-metadata.json".format(i)))
         os.makedirs(os.path.dirname(output_filename), exist_ok=True)
-        opts = {
-            "polygon_to_tile_list": shlex.quote(os.path.abspath(polygon_to_tile_list)),
-            "geojson_path": shlex.quote(geojson_path),
-            "input_dir": shlex.quote(input_dir),
-            "metadata_path": shlex.quote(metadata_path),
-            "metadata_path_for_regex": shlex.quote(remove_leading_slash(metadata_path)),
-            "output_filename": shlex.quote(output_filename),
-            "minzoom": shlex.quote(str(minzoom)),
-            "maxzoom": shlex.quote(str(maxzoom)),
-            "suffix": shlex.quote(suffix),
-        }
+        tile_list_args = [os.path.abspath(polygon_to_tile_list), "-c", "-n", "-a", metadata_path, "-g", geojson_path, "-z", str(minzoom), "-Z", str(maxzoom), "-s", suffix]
+        # tar removes the leading slash from the absolute path of the metadata file.
+        # Sort the file names byte-wise. Neighbouring tiles end up next to each other in the tarball, which gives the
+        # compressor more similar data within its window. tar cannot sort names read with --files-from itself.
+        sort_args = ["sort", "--zero-terminated"]
+        tar_args = ["tar", "--null", "-c", "--owner=0", "--group=0", "--transform=flags=r;s,{},metadata.json,".format(transform_regex(remove_leading_slash(metadata_path))), "--files-from=-"]
+        compress_args = ["gzip", "-1"]
+        if PIGZ:
+            compress_args = [PIGZ, "-1", "-p", str(compress_threads)]
+        elif IGZIP:
+            compress_args = [IGZIP, "-1", "-c"]
         logger.info("{}: Creating tile set {}".format(i, region_path))
-        args = "{polygon_to_tile_list} -c -n -a {metadata_path} -g {geojson_path} -z {minzoom} -Z {maxzoom} -s {suffix} | tar --null -c --owner=0 --group=0 --transform='flags=r;s|{metadata_path_for_regex}|metadata.json|' --files-from=- | gzip -1 > {output_filename}".format(**opts)
-        run_cmd(args, i, True, input_dir, {"OGR_ENABLE_PARTIAL_REPROJECTION": "TRUE"})
+        # polygon_to_tile_list | sort | tar | gzip > part_filename
+        with open(part_filename, "wb") as outfile:
+            procs.append(start_cmd(tile_list_args, i, input_dir, {"OGR_ENABLE_PARTIAL_REPROJECTION": "TRUE"}))
+            procs.append(start_cmd(sort_args, i, env=dict(os.environ, LC_ALL="C"), stdin=procs[0].stdout))
+            procs.append(start_cmd(tar_args, i, input_dir, stdin=procs[1].stdout))
+            procs.append(start_cmd(compress_args, i, stdin=procs[2].stdout, stdout=outfile))
+            # Close our copies of the pipes. A command gets SIGPIPE if the next one in the pipeline terminates early.
+            for proc in procs[:-1]:
+                proc.stdout.close()
+            wait_pipeline(procs, i)
+        # Remove the old signature first. It must not remain next to a new file if writing the new one fails.
+        delete_if_exists(output_filename + ".sig")
+        os.replace(part_filename, output_filename)
+        write_signature(output_filename, signature)
     except subprocess.CalledProcessError:
         error = True
+    except Exception as e:
+        logger.exception(e)
+        error = True
     finally:
+        for proc in procs:
+            if proc.poll() is None:
+                proc.kill()
+                proc.wait()
         delete_if_exists(geojson_path)
         delete_if_exists(metadata_path)
     if error:
-        exit(1)
+        # Don't leave an incomplete tile set behind.
+        delete_if_exists(part_filename)
+        logger.error("{}: Failed to create tile set {}".format(i, region_path))
+        return False
     logger.info("{}: Completed tile set {}".format(i, region_path))
     return True
 
 
-def find_region(geojson_data, region_id):
-    """Return GeoJSON feature matching the provided region_id or None if not found."""
-    for feature in geojson_data["features"]:
-        if feature.get("properties", {}).get("id") == region_id:
-            return feature
-    return None
-
-
-parser = argparse.ArgumentParser(description="Split a vector tile set (in z/x/y.pbf structure) into multiple tile sets.")
-parser.add_argument("-c", "--config", type=argparse.FileType("r"), required=True, help="Configuration file in YAML format")
-parser.add_argument("-f", "--format", type=str, required=True, help="Input and output format ('mbtiles' for MBTiles input and output, 'tar.gz' for input from directory and output to .tar.gz)")
-parser.add_argument("-g", "--geojson", type=argparse.FileType("r"), required=True, help="GeoJSON index file containing clipping polygons for all regions.")
-parser.add_argument("-i", "--input", type=str, required=True, help="Path to input tileset")
-parser.add_argument("-l", "--log-level", help="log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)", default="INFO", type=str)
-parser.add_argument("-o", "--output", type=str, required=True, help="Output base directory")
-parser.add_argument("-p", "--processes", type=int, default=8, help="Number of parallel processes")
-parser.add_argument("-s", "--suffix", type=str, default=".pbf", help="File name suffix, should start with a dot. Ignore if output is written in MBTiles format.")
-parser.add_argument("-S", "--strict", action="store_true", help="Fail if a requested region is not found")
-parser.add_argument("-t", "--tilelist", type=str, required=True, help="Path to program to generate a list of tiles from polygon")
-parser.add_argument("-z", "--minzoom", type=int, help="Minimum zoom level", default=0)
-parser.add_argument("-Z", "--maxzoom", type=int, help="Maximium zoom level", default=14)
-args = parser.parse_args()
-
-numeric_log_level = getattr(logging, args.log_level.upper())
-if not isinstance(numeric_log_level, int):
-    raise ValueError("Invalid log level {}".format(args.log_level.upper()))
-logging.basicConfig(level=numeric_log_level, format="%(asctime)s %(levelname)s: %(message)s")
-logger = logging.getLogger()
+def run_task(func, task):
+    """Call func with the arguments of a task tuple.
+    """
+    return func(*task)
+
+
+def iter_features(geojson_file):
+    """Yield the features of a GeoJSON FeatureCollection. The file is parsed incrementally if ijson is installed.
+    """
+    # Read bytes, there is no need to decode the file before parsing it.
+    geojson_file = getattr(geojson_file, "buffer", geojson_file)
+    if ijson:
+        # By default, ijson returns numbers as Decimal which the json module cannot serialize.
+        yield from ijson.items(geojson_file, "features.item", use_float=True)
+    else:
+        yield from json_loads(geojson_file.read()).get("features", [])
+
+
+def index_regions(features, polygon_ids):
+    """Return a dictionary of the valid GeoJSON features with the given IDs by their ID, a dictionary of the error
+    messages of the invalid ones by their ID and the total number of features.
+
+    If an ID is used multiple times, the first feature wins. All other features are dropped immediately.
+    """
+    index = {}
+    invalid = {}
+    count = 0
+    for feature in features:
+        count += 1
+        polygon_id = (feature.get("properties") or {}).get("id")
+        if polygon_id not in polygon_ids:
+            continue
+        if polygon_id in index or polygon_id in invalid:
+            logger.warning("GeoJSON feature ID {} is used multiple times, using its first feature.".format(polygon_id))
+            continue
+        try:
+            validate_feature(feature)
+        except GeoJSONError as e:
+            invalid[polygon_id] = str(e)
+            continue
+        index[polygon_id] = feature
+    return index, invalid, count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split a vector tile set (in z/x/y.pbf structure) into multiple tile sets.")
+    parser.add_argument("-c", "--config", type=argparse.FileType("r"), required=True, help="Configuration file in YAML format")
+    parser.add_argument("--compress-threads", type=int, default=2, help="tar.gz only: Number of compression threads per process if pigz is installed")
+    parser.add_argument("--copy-threshold", type=float, help="MBTiles only: Create regions containing more than this share (0.0 to 1.0) of the input tiles by copying the input file and deleting the other tiles. Only worth it on file systems supporting reflinks (e.g. Btrfs, XFS). Disabled by default.")
+    parser.add_argument("-f", "--format", type=str, required=True, help="Input and output format ('mbtiles' for MBTiles input and output, 'tar.gz' for input from directory and output to .tar.gz)")
+    parser.add_argument("-g", "--geojson", type=argparse.FileType("r"), required=True, help="GeoJSON index file containing clipping polygons for all regions.")
+    parser.add_argument("-i", "--input", type=str, required=True, help="Path to input tileset")
+    parser.add_argument("-l", "--log-level", help="log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)", default="INFO", type=str)
+    parser.add_argument("--max-tasks-per-child", type=int, default=50, help="Number of regions a worker process creates before it is replaced by a new one. Limits the growth of memory usage over long runs.")
+    parser.add_argument("-o", "--output", type=str, required=True, help="Output base directory")
+    parser.add_argument("-p", "--processes", type=int, default=8, help="Number of parallel processes")
+    parser.add_argument("-s", "--suffix", type=str, default=".pbf", help="File name suffix, should start with a dot. Ignore if output is written in MBTiles format.")
+    parser.add_argument("--skip-existing", action="store_true", help="Skip regions whose output file is newer than the input and has been created with the same parameters. The parameters are stored in .sig files next to the output files. For directory input, only the modification time of its metadata.json file is checked.")
+    parser.add_argument("-S", "--strict", action="store_true", help="Fail if a requested region is not found")
+    parser.add_argument("--tmpdir", type=str, help="Directory for temporary files. It should be on a local disk. Defaults to /dev/shm if it is writable, to the system default otherwise.")
+    parser.add_argument("-t", "--tilelist", type=str, required=True, help="Path to program to generate a list of tiles from polygon")
+    parser.add_argument("-z", "--minzoom", type=int, help="Minimum zoom level", default=0)
+    parser.add_argument("-Z", "--maxzoom", type=int, help="Maximium zoom level", default=14)
+    args = parser.parse_args()
+
+    numeric_log_level = getattr(logging, args.log_level.upper())
+    if not isinstance(numeric_log_level, int):
+        raise ValueError("Invalid log level {}".format(args.log_level.upper()))
+    setup_logging(numeric_log_level)
+
+    if not os.path.isfile(args.tilelist):
+        logging.error("{} is not a file.".format(args.tilelist))
+        exit(1)
 
-if not os.path.isfile(args.tilelist):
-    logging.error("{} is not a file.".format(args.tilelist))
-    exit(1)
+    if args.minzoom < 0 or args.maxzoom > 20 or args.minzoom > args.maxzoom:
+        logging.error("Zoom levels out of range or swapped")
+        exit(1)
 
-if args.minzoom < 0 or args.maxzoom > 20 or args.minzoom > args.maxzoom:
-    logging.error("Zoom levels out of range or swapped")
-    exit(1)
+    if args.copy_threshold is not None and not 0.0 <= args.copy_threshold <= 1.0:
+        logging.error("Copy threshold must be between 0.0 and 1.0")
+        exit(1)
 
-output_format = args.format.lower()
-if output_format not in ["mbtiles", "tar.gz"]:
-    logging.error("Output format must be either 'mbtiles' or 'tar.gz'")
-    exit(1)
+    if args.max_tasks_per_child < 1:
+        logging.error("Maximum number of tasks per child process must be at least 1")
+        exit(1)
 
-for d in [args.input, args.output]:
-    if not os.path.isdir(d) and (d != args.input or args.format == "tar.gz"):
-        logging.error("{} is not a directory.".format(d))
+    if args.compress_threads < 1:
+        logging.error("Number of compression threads must be at least 1")
         exit(1)
 
-if args.suffix is not None and not args.suffix.startswith("."):
-    logging.warning("File name suffix does not start with a dot.")
-
-logging.debug("Loading configuration")
-config = yaml.safe_load(args.config)
-requested_regions = config["polygons"]
-path_template = config["path_template"]
-if type(requested_regions) is not list or len(requested_regions) == 0:
-    logging.error("Configuration is invalid, 'polyogns' not found or an empty list.")
-    exit(1)
-
-logging.debug("Loading clipping polygons")
-geojson_data = json.load(args.geojson)
-if len(geojson_data.get("features", [])) == 0:
-    logging.error("GeoJSON is empty or invalid")
-    exit(1)
-
-charset = None
-if output_format == "mbtiles":
-    logging.debug("Get encoding of input file")
-    conn = None
-    cur = None
+    output_format = args.format.lower()
+    if output_format not in ["mbtiles", "tar.gz"]:
+        logging.error("Output format must be either 'mbtiles' or 'tar.gz'")
+        exit(1)
+
+    for d in [args.input, args.output]:
+        if not os.path.isdir(d) and (d != args.input or args.format == "tar.gz"):
+            logging.error("{} is not a directory.".format(d))
+            exit(1)
+
+    if args.tmpdir is not None:
+        if not os.path.isdir(args.tmpdir):
+            logging.error("{} is not a directory.".format(args.tmpdir))
+            exit(1)
+        # The commands of the workers run in other working directories and need absolute paths of the temporary files.
+        args.tmpdir = os.path.abspath(args.tmpdir)
+
+    if args.suffix is not None and not args.suffix.startswith("."):
+        logging.warning("File name suffix does not start with a dot.")
+
+    logging.debug("Loading configuration")
     try:
-        conn = sqlite3.connect(args.input)
-        cur = conn.execute("PRAGMA encoding;")
-        charset = cur.fetchone()[0]
-    except Exception as e:
-        logger.exception(e)
+        config = yaml.safe_load(args.config)
+        validate_config(config)
+    except (yaml.YAMLError, ConfigError) as e:
+        logging.error("Configuration is invalid: {}".format(e))
+        exit(1)
+    requested_regions = config["polygons"]
+    path_template = config["path_template"]
+
+    logging.debug("Loading clipping polygons")
+    # Only the features of the requested regions are kept in memory.
+    region_index, invalid_regions, feature_count = index_regions(iter_features(args.geojson), {polygon["id"] for polygon in requested_regions})
+    if feature_count == 0:
+        logging.error("GeoJSON is empty or invalid")
         exit(1)
-    finally:
-        if cur:
-            cur.close()
-        if conn:
-            conn.close()
 
-tasks = []
-i = 1
-# regions_paths to check them for uniqueness
-region_paths = set()
-for polygon in requested_regions:
-    polygon_id = polygon["id"]
-    geojson_feature = find_region(geojson_data, polygon_id)
-    if not geojson_feature:
-        msg = "Region {} not found among GeoJSON features."
-        if args.strict:
-            logger.error(msg)
+    charset = None
+    source_metadata = None
+    copy_min_tiles = None
+    if output_format == "mbtiles":
+        logging.debug("Get encoding and metadata of input file")
+        conn = None
+        cur = None
+        try:
+            conn = sqlite3.connect(read_only_uri(args.input), uri=True)
+            cur = conn.execute("PRAGMA encoding;")
+            charset = cur.fetchone()[0]
+            cur.close()
+            # The metadata is the same for all regions except for bounds and center, read it only once.
+            cur = conn.execute("SELECT name, value FROM metadata WHERE name NOT IN ('bounds', 'center');")
+            source_metadata = cur.fetchall()
+            cur.close()
+            if args.copy_threshold is not None:
+                # Large regions are created from a copy of the input file. This requires tiles to be a table, not a view.
+                cur = conn.execute("SELECT type FROM sqlite_master WHERE name = 'tiles';")
+                if cur.fetchone() == ("table",):
+                    cur.close()
+                    cur = conn.execute("SELECT count(*) FROM tiles;")
+                    copy_min_tiles = args.copy_threshold * cur.fetchone()[0]
+                else:
+                    logger.warning("Input file cannot be copied because its tiles table is a view. Ignoring --copy-threshold.")
+        except Exception as e:
+            logger.exception(e)
+            exit(1)
+        finally:
+            if cur:
+                cur.close()
+            if conn:
+                conn.close()
+    elif output_format == "tar.gz":
+        logging.debug("Read metadata.json of input directory")
+        # The metadata is the same for all regions except for bounds and center, read it only once.
+        try:
+            with open(os.path.join(args.input, "metadata.json"), "rb") as infile:
+                source_metadata = json_loads(infile.read())
+        except Exception as e:
+            logger.exception(e)
+            exit(1)
+
+    input_mtime = None
+    if args.skip_existing:
+        if output_format == "tar.gz":
+            # Walking all tiles would take longer than creating many regions. metadata.json is written with the tiles.
+            input_mtime = os.path.getmtime(os.path.join(args.input, "metadata.json"))
+        else:
+            input_mtime = os.path.getmtime(args.input)
+
+    # Output paths have to be unique, otherwise regions would overwrite each other.
+    region_paths = set()
+    for polygon in requested_regions:
+        region_path = polygon["region_path"]
+        if region_path in region_paths:
+            logger.error("Output path {} is used twice.".format(get_output_path(args.output, path_template, output_format, region_path)))
             sys.exit(1)
+        region_paths.add(region_path)
+
+    tasks = []
+    features = {}
+    for i, polygon in enumerate(requested_regions, 1):
+        if not check_region(polygon, region_index, invalid_regions, args.strict):
+            continue
+        polygon_id = polygon["id"]
+        region_path = polygon["region_path"]
+        geojson_feature = region_index[polygon_id]
+        # All work on the geometry is done here once: the workers get the bounding box and the serialized feature.
+        geojson_data = feature_collection_json(geojson_feature)
+        # Signature files are only written if they are used.
+        signature = None
+        if args.skip_existing:
+            signature = get_signature(geojson_feature, output_format, args.minzoom, args.maxzoom, args.suffix, source_metadata)
+            if is_up_to_date(get_output_path(args.output, path_template, output_format, region_path), input_mtime, signature):
+                logger.info("Skipping {}, output file is up to date".format(region_path))
+                continue
+        features[polygon_id] = geojson_data
+        bbox = get_bbox(geojson_feature["geometry"])
+        tasks.append((i, args.tilelist, args.input, args.output, region_path, polygon_id, bbox, args.minzoom, args.maxzoom, args.suffix, path_template, charset, source_metadata, copy_min_tiles, signature))
+
+    # Start with the largest regions. Otherwise a large region submitted late can keep a single worker busy long after
+    # all others have finished. The area of the bounding box serves as estimate of the size.
+    tasks.sort(key=lambda t: get_bbox_area(t[6]), reverse=True)
+
+    logger.info("Processing {} regions".format(len(tasks)))
+    if output_format == "tar.gz":
+        worker = functools.partial(run_task, create_tileset_targz)
+    elif output_format == "mbtiles":
+        worker = functools.partial(run_task, create_tileset_mbtiles)
+    # Temporary files of all workers are written to a single directory which is removed at the end.
+    with tempfile.TemporaryDirectory(prefix="split-vectortiles-", dir=args.tmpdir or TEMP_PARENT_DIR) as tmp:
+        # The GeoJSON features are handed over once per worker process instead of once per task. With the fork start
+        # method, they are not even pickled because the workers inherit the memory of the parent. It is not the default
+        # on all platforms and Python versions (e.g. Python 3.14 uses forkserver on Linux), so request it explicitly.
+        if "fork" in multiprocessing.get_all_start_methods():
+            mp_context = multiprocessing.get_context("fork")
         else:
-            logger.warning(msg)
-    region_path = polygon["region_path"]
-    if region_path in region_paths:
-        logger.error("Output path {} is used twice.".format(get_output_path(args.output, path_template, args.suffix, region_path)))
+            mp_context = multiprocessing.get_context()
+        pool = mp_context.Pool(processes=args.processes, initializer=init_worker, initargs=(numeric_log_level, features, tmp, args.compress_threads), maxtasksperchild=args.max_tasks_per_child)
+        # Results are collected in the order the tasks finish. Tasks are handed out one by one. Chunks would
+        # batch the largest regions together at the beginning and spoil the ordering by size. The overhead per task
+        # is negligible compared to the time needed to create a tile set.
+        failed = 0
+        try:
+            for success in pool.imap_unordered(worker, tasks, chunksize=1):
+                if not success:
+                    failed += 1
+        except KeyboardInterrupt:
+            logger.error("Interrupted, terminating worker processes")
+            pool.terminate()
+            pool.join()
+            sys.exit(1)
+        pool.close()
+        pool.join()
+
+    if failed:
+        logger.error("Failed to create {} of {} tile sets".format(failed, len(tasks)))
         sys.exit(1)
-    tasks.append((i, args.tilelist, args.input, args.output, region_path, geojson_feature, args.minzoom, args.maxzoom, args.suffix, path_template, charset))
-    i += 1
-
-logger.info("Processing {} regions".format(len(tasks)))
-pool = multiprocessing.Pool(processes=args.processes)
-if output_format == "tar.gz":
-    result = [ pool.apply_async(create_tileset_targz, args=t) for t in tasks ]
-elif output_format == "mbtiles":
-    result = [ pool.apply_async(create_tileset_mbtiles, args=t) for t in tasks ]
-output = [p.get() for p in result]
+
+
+if __name__ == "__main__":
+    main()